@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
+import hmac
+import threading
+import time
 import uuid
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -13,8 +21,80 @@ import logging
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+class PoolStateListener(monitoring.ConnectionPoolListener):
+    """Tracks connection pool usage for the readiness probe
+
+    pymongo calls these hooks from Motor's executor threads, so the counters
+    are guarded by a lock. Counts are summed over the pools of every server
+    the client talks to. checkouts_pending is checkouts that have started but
+    not finished: that includes opening a new connection as well as waiting
+    for a free one, so it only means queueing when it stays high.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.checkouts_pending = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.checkouts_pending += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkouts_pending -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts_pending -= 1
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "checkouts_pending": self.checkouts_pending,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+            }
+
+pool_listener = PoolStateListener()
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[pool_listener])
 db = client[os.environ['DB_NAME']]
 
 logger = logging.getLogger(__name__)
@@ -83,9 +163,372 @@ class GameStats(BaseModel):
     total_pickups: int
     most_used_powerups: List[dict]
 
+class PersonalBest(BaseModel):
+    score: int
+    wave_reached: int
+    difficulty: str
+    created_at: datetime
+
+class TimelineDay(BaseModel):
+    date: str  # YYYY-MM-DD
+    games: int
+    average_score: float
+    max_combo: int
+    max_wave: int
+
+class PlayerTimeline(BaseModel):
+    session_id: str
+    player_name: str
+    best_score: int
+    total_games: int
+    personal_bests: List[PersonalBest]
+    difficulty_bests: dict
+    daily: List[TimelineDay]
+
 # Database collections
 SCORES_COLLECTION = "game_scores"
 ANALYTICS_COLLECTION = "game_analytics"
+SCORE_ARCHIVE_COLLECTION = "game_score_archive"  # monthly summaries of archived runs
+PLAYER_ARCHIVE_COLLECTION = "game_player_archive"  # per-player bests of archived runs
+SCORE_HISTOGRAM_COLLECTION = "game_score_histogram"  # run counts per score of archived runs
+LOCKS_COLLECTION = "game_locks"  # leases for background jobs
+PLAYER_TIMELINE_COLLECTION = "game_player_timelines"  # per-player progress summaries
+
+# Archival settings. Runs older than SCORE_ARCHIVE_AFTER_DAYS that are not in the
+# all-time top SCORE_ARCHIVE_PROTECT_TOP_K get folded into the archive collections.
+# The age never drops below 31 days so the daily/weekly/monthly leaderboards stay
+# fully served from game_scores.
+SCORE_ARCHIVE_AFTER_DAYS = max(31, int(os.environ.get('SCORE_ARCHIVE_AFTER_DAYS', '90')))
+SCORE_ARCHIVE_PROTECT_TOP_K = int(os.environ.get('SCORE_ARCHIVE_PROTECT_TOP_K', '100'))
+SCORE_ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('SCORE_ARCHIVE_INTERVAL_SECONDS', '3600'))
+SCORE_ARCHIVE_BATCH_SIZE = int(os.environ.get('SCORE_ARCHIVE_BATCH_SIZE', '1000'))
+SCORE_ARCHIVE_LEASE_SECONDS = int(os.environ.get('SCORE_ARCHIVE_LEASE_SECONDS', '600'))
+
+# Token for the admin routes below, sent as X-Admin-Token. Unset disables them.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+_archiver_task: Optional[asyncio.Task] = None
+_archive_indexes_ready = False
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+def _field_key(value: str) -> str:
+    # Mongo field names can't contain '.', start with '$' or be empty
+    return value.replace(".", "_").replace("$", "_") or "_"
+
+async def _acquire_archive_lease(owner: str) -> bool:
+    """Take or renew the lease that lets one worker run the archiver"""
+    now = datetime.utcnow()
+    try:
+        await db[LOCKS_COLLECTION].find_one_and_update(
+            {"_id": "score_archiver", "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner,
+                      "expires_at": now + timedelta(seconds=SCORE_ARCHIVE_LEASE_SECONDS)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def _release_archive_lease(owner: str):
+    # Expire rather than delete, the lease doc also holds the batch counter
+    await db[LOCKS_COLLECTION].update_one(
+        {"_id": "score_archiver", "owner": owner},
+        {"$set": {"owner": None, "expires_at": datetime(1970, 1, 1)}}
+    )
+
+async def _next_archive_batch(owner: str) -> Optional[int]:
+    """Allocate the next batch number from the counter on the lease doc
+
+    Batch numbers come from Mongo rather than a worker's clock, so they always
+    increase and the last_batch guards below stay valid. Returns None if the
+    lease has been lost.
+    """
+    lease = await db[LOCKS_COLLECTION].find_one_and_update(
+        {"_id": "score_archiver", "owner": owner},
+        {"$inc": {"seq": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    return lease["seq"] if lease else None
+
+async def _ensure_archive_indexes() -> bool:
+    """Create the score indexes once; the archive's unique ones make re-folding a batch safe"""
+    global _archive_indexes_ready
+    if not _archive_indexes_ready:
+        try:
+            await db[SCORES_COLLECTION].create_index("created_at")
+            await db[SCORES_COLLECTION].create_index([("score", -1)])
+            await db[SCORES_COLLECTION].create_index("archive_batch", sparse=True)
+            await db[SCORES_COLLECTION].create_index([("session_id", 1), ("created_at", 1)])
+            await db[SCORE_ARCHIVE_COLLECTION].create_index("month", unique=True)
+            await db[PLAYER_ARCHIVE_COLLECTION].create_index("session_id", unique=True)
+            await db[SCORE_HISTOGRAM_COLLECTION].create_index("score", unique=True)
+            await db[PLAYER_TIMELINE_COLLECTION].create_index("session_id", unique=True)
+            _archive_indexes_ready = True
+        except Exception as e:
+            logger.error(f"Error creating score indexes: {str(e)}")
+    return _archive_indexes_ready
+
+async def _guarded_bulk_write(collection: str, operations: list):
+    # Updates are filtered on last_batch < batch, so a batch that was already
+    # applied turns its upsert into a duplicate key error, which is expected
+    if not operations:
+        return
+    try:
+        await db[collection].bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+async def _fold_archive_batch(batch_id: int) -> int:
+    """Fold the runs claimed by batch_id into the archive and delete them"""
+    batch = await db[SCORES_COLLECTION].find({"archive_batch": batch_id}).to_list(length=None)
+    if not batch:
+        return 0
+
+    months = {}
+    players = {}
+    histogram = {}
+    for score in batch:
+        month = score["created_at"].strftime("%Y-%m")
+        summary = months.setdefault(month, {
+            "inc": {"total_games": 0, "score_sum": 0, "time_sum": 0,
+                    "total_enemies": 0, "total_pickups": 0},
+            "top_score": 0,
+        })
+        summary["inc"]["total_games"] += 1
+        summary["inc"]["score_sum"] += score["score"]
+        summary["inc"]["time_sum"] += score["time_survived"]
+        summary["inc"]["total_enemies"] += score["enemies_defeated"]
+        summary["inc"]["total_pickups"] += score["pickups_collected"]
+        for powerup in score.get("powerups_used", []):
+            key = f"powerups.{_field_key(powerup)}"
+            summary["inc"][key] = summary["inc"].get(key, 0) + 1
+        summary["top_score"] = max(summary["top_score"], score["score"])
+
+        player = players.setdefault(score["session_id"], {
+            "player_name": score["player_name"],
+            "best_score": 0,
+            "games": 0,
+        })
+        player["best_score"] = max(player["best_score"], score["score"])
+        player["games"] += 1
+
+        histogram[score["score"]] = histogram.get(score["score"], 0) + 1
+
+    await _guarded_bulk_write(SCORE_ARCHIVE_COLLECTION, [
+        UpdateOne(
+            {"month": month, "last_batch": {"$lt": batch_id}},
+            {"$inc": summary["inc"], "$max": {"top_score": summary["top_score"]},
+             "$set": {"last_batch": batch_id}},
+            upsert=True
+        )
+        for month, summary in months.items()
+    ])
+    await _guarded_bulk_write(PLAYER_ARCHIVE_COLLECTION, [
+        UpdateOne(
+            {"session_id": session_id, "last_batch": {"$lt": batch_id}},
+            {"$set": {"player_name": player["player_name"], "last_batch": batch_id},
+             "$max": {"best_score": player["best_score"]},
+             "$inc": {"games": player["games"]}},
+            upsert=True
+        )
+        for session_id, player in players.items()
+    ])
+    await _guarded_bulk_write(SCORE_HISTOGRAM_COLLECTION, [
+        UpdateOne(
+            {"score": score, "last_batch": {"$lt": batch_id}},
+            {"$inc": {"count": count}, "$set": {"last_batch": batch_id}},
+            upsert=True
+        )
+        for score, count in histogram.items()
+    ])
+
+    result = await db[SCORES_COLLECTION].delete_many({"archive_batch": batch_id})
+    return result.deleted_count
+
+async def archive_old_scores() -> dict:
+    """Fold old, non top-K runs into monthly summaries, per-player bests and a score histogram
+
+    Runs are first claimed by stamping them with a batch number, then folded
+    and deleted. Summary updates are guarded by the batch number, so a batch
+    left behind by a crash can be re-folded without counting it twice. Only
+    the worker holding the archive lease runs at a time.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=SCORE_ARCHIVE_AFTER_DAYS)
+    if not await _ensure_archive_indexes():
+        raise RuntimeError("score archive indexes are missing")
+    owner = str(uuid.uuid4())
+    if not await _acquire_archive_lease(owner):
+        return {"archived": 0, "cutoff": cutoff, "skipped": "another archiver holds the lease"}
+
+    archived = 0
+    try:
+        # Finish batches an interrupted run claimed but never deleted, oldest first,
+        # before any newer batch number is applied
+        for batch_id in sorted(await db[SCORES_COLLECTION].distinct(
+            "archive_batch", {"archive_batch": {"$exists": True}}
+        )):
+            archived += await _fold_archive_batch(batch_id)
+
+        protected = await db[SCORES_COLLECTION].find(
+            {}, {"id": 1}
+        ).sort("score", -1).limit(SCORE_ARCHIVE_PROTECT_TOP_K).to_list(length=SCORE_ARCHIVE_PROTECT_TOP_K)
+        protected_ids = [doc["id"] for doc in protected]
+
+        while await _acquire_archive_lease(owner):
+            candidates = await db[SCORES_COLLECTION].find(
+                {"created_at": {"$lt": cutoff}, "id": {"$nin": protected_ids},
+                 "archive_batch": {"$exists": False}},
+                {"id": 1}
+            ).sort("created_at", 1).limit(SCORE_ARCHIVE_BATCH_SIZE).to_list(length=SCORE_ARCHIVE_BATCH_SIZE)
+            if not candidates:
+                break
+
+            batch_id = await _next_archive_batch(owner)
+            if batch_id is None:
+                break
+            await db[SCORES_COLLECTION].update_many(
+                {"id": {"$in": [doc["id"] for doc in candidates]}, "archive_batch": {"$exists": False}},
+                {"$set": {"archive_batch": batch_id}}
+            )
+            archived += await _fold_archive_batch(batch_id)
+    finally:
+        await _release_archive_lease(owner)
+
+    if archived:
+        logger.info(f"Archived {archived} scores older than {cutoff.isoformat()}")
+    return {"archived": archived, "cutoff": cutoff}
+
+async def _archive_loop():
+    while True:
+        try:
+            await archive_old_scores()
+        except Exception as e:
+            logger.error(f"Error archiving scores: {str(e)}")
+        await asyncio.sleep(SCORE_ARCHIVE_INTERVAL_SECONDS)
+
+@game_router.on_event("startup")
+async def start_score_archiver():
+    global _archiver_task
+    if not await _ensure_archive_indexes():
+        logger.error("Score archiver not started, indexes missing")
+        return
+    _archiver_task = asyncio.create_task(_archive_loop())
+
+@game_router.on_event("shutdown")
+async def stop_score_archiver():
+    if _archiver_task:
+        _archiver_task.cancel()
+
+async def record_timeline_run(score: GameScore):
+    """Fold a single run into the player's precomputed timeline
+
+    Timelines are only created here, from the player's full history (which
+    already includes this run) and only if none exists yet, so a run is never
+    both part of a rebuild and incremented on top of it.
+    """
+    day = score.created_at.strftime("%Y-%m-%d")
+    difficulty = _field_key(score.difficulty)
+
+    async def increment():
+        return await db[PLAYER_TIMELINE_COLLECTION].find_one_and_update(
+            {"session_id": score.session_id},
+            {
+                "$set": {"player_name": score.player_name, "updated_at": score.created_at},
+                "$inc": {
+                    "total_games": 1,
+                    f"days.{day}.games": 1,
+                    f"days.{day}.score_sum": score.score,
+                },
+                "$max": {
+                    "best_score": score.score,
+                    f"difficulty_bests.{difficulty}": score.score,
+                    f"days.{day}.max_combo": score.combo_max,
+                    f"days.{day}.max_wave": score.wave_reached,
+                },
+            },
+            return_document=ReturnDocument.BEFORE
+        )
+
+    previous = await increment()
+    if previous is None:
+        try:
+            await rebuild_player_timeline(score.session_id)
+            return
+        except DuplicateKeyError:
+            # Another submission from this player created it first
+            previous = await increment()
+            if previous is None:
+                return
+
+    if score.score > previous.get("best_score", 0):
+        await db[PLAYER_TIMELINE_COLLECTION].update_one(
+            {"session_id": score.session_id},
+            {"$push": {"personal_bests": {
+                "score": score.score,
+                "wave_reached": score.wave_reached,
+                "difficulty": difficulty,
+                "created_at": score.created_at,
+            }}}
+        )
+
+async def build_player_timeline(session_id: str) -> Optional[dict]:
+    """Compute a player's timeline from their archived best and stored runs"""
+    def empty_timeline():
+        return {
+            "session_id": session_id,
+            "best_score": 0,
+            "total_games": 0,
+            "difficulty_bests": {},
+            "days": {},
+            "personal_bests": [],
+        }
+
+    # Archived runs are older than any hot run and only their best and count survive
+    timeline = None
+    archived = await db[PLAYER_ARCHIVE_COLLECTION].find_one({"session_id": session_id})
+    if archived:
+        timeline = empty_timeline()
+        timeline["player_name"] = archived["player_name"]
+        timeline["best_score"] = archived["best_score"]
+        timeline["total_games"] = archived["games"]
+
+    async for run in db[SCORES_COLLECTION].find({"session_id": session_id}).sort("created_at", 1):
+        if timeline is None:
+            timeline = empty_timeline()
+        day = run["created_at"].strftime("%Y-%m-%d")
+        difficulty = _field_key(run.get("difficulty", "normal"))
+
+        timeline["player_name"] = run["player_name"]
+        timeline["updated_at"] = run["created_at"]
+        if run["score"] > timeline["best_score"] or timeline["total_games"] == 0:
+            timeline["personal_bests"].append({
+                "score": run["score"],
+                "wave_reached": run["wave_reached"],
+                "difficulty": difficulty,
+                "created_at": run["created_at"],
+            })
+        timeline["best_score"] = max(timeline["best_score"], run["score"])
+        timeline["total_games"] += 1
+        timeline["difficulty_bests"][difficulty] = max(
+            timeline["difficulty_bests"].get(difficulty, 0), run["score"]
+        )
+        stats = timeline["days"].setdefault(day, {"games": 0, "score_sum": 0, "max_combo": 0, "max_wave": 0})
+        stats["games"] += 1
+        stats["score_sum"] += run["score"]
+        stats["max_combo"] = max(stats["max_combo"], run["combo_max"])
+        stats["max_wave"] = max(stats["max_wave"], run["wave_reached"])
+
+    return timeline
+
+async def rebuild_player_timeline(session_id: str):
+    """Store a freshly built timeline; raises DuplicateKeyError if one already exists"""
+    timeline = await build_player_timeline(session_id)
+    if timeline is not None:
+        await db[PLAYER_TIMELINE_COLLECTION].insert_one(timeline)
 
 # API Routes
 @game_router.post("/scores", response_model=GameScore)
@@ -98,6 +541,10 @@ async def submit_score(score_data: GameScoreCreate):
         result = await db[SCORES_COLLECTION].insert_one(score_obj.dict())
         
         if result.inserted_id:
+            try:
+                await record_timeline_run(score_obj)
+            except Exception as e:
+                logger.error(f"Error updating player timeline: {str(e)}")
             logger.info(f"Score submitted: {score_obj.score} by {score_obj.player_name}")
             return score_obj
         else:
@@ -150,15 +597,15 @@ async def get_leaderboard(
 async def get_game_stats():
     """Get overall game statistics"""
     try:
-        # Aggregate statistics
+        # Aggregate statistics over the hot collection
         pipeline = [
             {
                 "$group": {
                     "_id": None,
                     "total_games": {"$sum": 1},
                     "unique_players": {"$addToSet": "$player_name"},
-                    "average_score": {"$avg": "$score"},
-                    "average_time": {"$avg": "$time_survived"},
+                    "score_sum": {"$sum": "$score"},
+                    "time_sum": {"$sum": "$time_survived"},
                     "top_score": {"$max": "$score"},
                     "total_enemies": {"$sum": "$enemies_defeated"},
                     "total_pickups": {"$sum": "$pickups_collected"},
@@ -167,25 +614,38 @@ async def get_game_stats():
             }
         ]
         
-        result = await db[SCORES_COLLECTION].aggregate(pipeline).next()
-        
-        if not result:
-            return GameStats(
-                total_games=0,
-                total_players=0,
-                average_score=0.0,
-                average_time=0.0,
-                top_score=0,
-                total_enemies_defeated=0,
-                total_pickups=0,
-                most_used_powerups=[]
-            )
+        results = await db[SCORES_COLLECTION].aggregate(pipeline).to_list(length=1)
+        result = results[0] if results else {
+            "total_games": 0, "unique_players": [], "score_sum": 0, "time_sum": 0,
+            "top_score": 0, "total_enemies": 0, "total_pickups": 0, "all_powerups": []
+        }
         
         # Count powerup usage
         powerup_counts = {}
         for powerup_list in result["all_powerups"]:
             for powerup in powerup_list:
-                powerup_counts[powerup] = powerup_counts.get(powerup, 0) + 1
+                key = _field_key(powerup)
+                powerup_counts[key] = powerup_counts.get(key, 0) + 1
+        
+        # Fold in the monthly summaries of archived runs
+        total_games = result["total_games"]
+        score_sum = result["score_sum"]
+        time_sum = result["time_sum"]
+        top_score = result["top_score"]
+        total_enemies = result["total_enemies"]
+        total_pickups = result["total_pickups"]
+        async for summary in db[SCORE_ARCHIVE_COLLECTION].find({}):
+            total_games += summary.get("total_games", 0)
+            score_sum += summary.get("score_sum", 0)
+            time_sum += summary.get("time_sum", 0)
+            top_score = max(top_score, summary.get("top_score", 0))
+            total_enemies += summary.get("total_enemies", 0)
+            total_pickups += summary.get("total_pickups", 0)
+            for name, count in summary.get("powerups", {}).items():
+                powerup_counts[name] = powerup_counts.get(name, 0) + count
+        
+        players = set(result["unique_players"])
+        players.update(await db[PLAYER_ARCHIVE_COLLECTION].distinct("player_name"))
         
         most_used_powerups = [
             {"name": name, "count": count} 
@@ -193,13 +653,13 @@ async def get_game_stats():
         ]
         
         stats = GameStats(
-            total_games=result["total_games"],
-            total_players=len(result["unique_players"]),
-            average_score=round(result["average_score"], 2),
-            average_time=round(result["average_time"], 2),
-            top_score=result["top_score"],
-            total_enemies_defeated=result["total_enemies"],
-            total_pickups=result["total_pickups"],
+            total_games=total_games,
+            total_players=len(players),
+            average_score=round(score_sum / total_games, 2) if total_games else 0.0,
+            average_time=round(time_sum / total_games, 2) if total_games else 0.0,
+            top_score=top_score,
+            total_enemies_defeated=total_enemies,
+            total_pickups=total_pickups,
             most_used_powerups=most_used_powerups
         )
         
@@ -240,28 +700,78 @@ async def get_player_scores(session_id: str, limit: int = 10):
         logger.error(f"Error getting player scores: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@game_router.get("/player/{session_id}/timeline", response_model=PlayerTimeline)
+async def get_player_timeline(session_id: str):
+    """Get a player's progress timeline from their precomputed summary"""
+    try:
+        timeline = await db[PLAYER_TIMELINE_COLLECTION].find_one({"session_id": session_id})
+        if not timeline:
+            # Not stored yet; the player's next submission persists it
+            timeline = await build_player_timeline(session_id)
+        if not timeline:
+            raise HTTPException(status_code=404, detail="Player not found")
+        
+        daily = [
+            TimelineDay(
+                date=date,
+                games=day["games"],
+                average_score=round(day["score_sum"] / day["games"], 2) if day["games"] else 0.0,
+                max_combo=day["max_combo"],
+                max_wave=day["max_wave"]
+            )
+            for date, day in sorted(timeline.get("days", {}).items())
+        ]
+        
+        return PlayerTimeline(
+            session_id=session_id,
+            player_name=timeline["player_name"],
+            best_score=timeline["best_score"],
+            total_games=timeline["total_games"],
+            personal_bests=[PersonalBest(**pb) for pb in timeline.get("personal_bests", [])],
+            difficulty_bests=timeline.get("difficulty_bests", {}),
+            daily=daily
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting player timeline: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @game_router.get("/player/{session_id}/rank")
 async def get_player_rank(session_id: str):
     """Get current player's rank and best score"""
     try:
-        # Get player's best score
+        # Get player's best score, including archived runs
         best_score_doc = await db[SCORES_COLLECTION].find_one(
             {"session_id": session_id},
             sort=[("score", -1)]
         )
+        archived_player = await db[PLAYER_ARCHIVE_COLLECTION].find_one({"session_id": session_id})
         
-        if not best_score_doc:
+        if not best_score_doc and not archived_player:
             return {"rank": None, "best_score": 0, "total_players": 0}
         
-        best_score = best_score_doc["score"]
+        best_score = max(
+            best_score_doc["score"] if best_score_doc else 0,
+            archived_player["best_score"] if archived_player else 0
+        )
         
-        # Count players with higher scores
+        # Count runs above the player's best, hot and archived alike
         higher_scores = await db[SCORES_COLLECTION].count_documents(
             {"score": {"$gt": best_score}}
         )
+        archived_higher = await db[SCORE_HISTOGRAM_COLLECTION].aggregate([
+            {"$match": {"score": {"$gt": best_score}}},
+            {"$group": {"_id": None, "runs": {"$sum": "$count"}}}
+        ]).to_list(length=1)
+        if archived_higher:
+            higher_scores += archived_higher[0]["runs"]
         
         # Count total unique players
-        total_players = len(await db[SCORES_COLLECTION].distinct("session_id"))
+        sessions = set(await db[SCORES_COLLECTION].distinct("session_id"))
+        sessions.update(await db[PLAYER_ARCHIVE_COLLECTION].distinct("session_id"))
+        total_players = len(sessions)
         
         rank = higher_scores + 1
         
@@ -280,11 +790,14 @@ async def get_player_rank(session_id: str):
 async def delete_score(score_id: str):
     """Delete a specific score (admin only)"""
     try:
-        result = await db[SCORES_COLLECTION].delete_one({"id": score_id})
+        deleted = await db[SCORES_COLLECTION].find_one_and_delete({"id": score_id})
         
-        if result.deleted_count == 0:
+        if not deleted:
             raise HTTPException(status_code=404, detail="Score not found")
         
+        # Drop the player's timeline; it's rebuilt from the remaining runs
+        await db[PLAYER_TIMELINE_COLLECTION].delete_one({"session_id": deleted["session_id"]})
+        
         logger.info(f"Score deleted: {score_id}")
         return {"status": "deleted"}
         
@@ -294,18 +807,122 @@ async def delete_score(score_id: str):
         logger.error(f"Error deleting score: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@game_router.post("/admin/archive", dependencies=[Depends(require_admin_token)])
+async def run_score_archive():
+    """Run score archival immediately (admin only)"""
+    if not await _ensure_archive_indexes():
+        raise HTTPException(status_code=503, detail="Archive indexes unavailable")
+    try:
+        return await archive_old_scores()
+    except Exception as e:
+        logger.error(f"Error running score archive: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Health monitoring. A background task pings Mongo on an interval and records
+# the result; the probes below only read this in-memory status.
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.environ.get('HEALTH_CHECK_INTERVAL_SECONDS', '5'))
+HEALTH_MAX_LOOP_LAG_MS = float(os.environ.get('HEALTH_MAX_LOOP_LAG_MS', '500'))
+# Readiness fails when more checkouts than this are in flight at once (see PoolStateListener)
+HEALTH_MAX_PENDING_CHECKOUTS = int(os.environ.get('HEALTH_MAX_PENDING_CHECKOUTS', '50'))
+
+health_status = {
+    "db_ok": False,
+    "db_latency_ms": None,
+    "db_error": None,
+    "last_check": None,
+    "loop_lag_ms": 0.0,
+}
+_health_task: Optional[asyncio.Task] = None
+
+async def _health_monitor_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(client.admin.command("ping"), timeout=HEALTH_CHECK_INTERVAL_SECONDS)
+            health_status["db_ok"] = True
+            health_status["db_latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            health_status["db_error"] = None
+        except Exception as e:
+            if health_status["db_ok"]:
+                logger.error(f"Game API database ping failed: {str(e)}")
+            health_status["db_ok"] = False
+            health_status["db_latency_ms"] = None
+            health_status["db_error"] = str(e) or type(e).__name__
+        health_status["last_check"] = datetime.utcnow()
+
+        # Event-loop lag is how late the sleep wakes up
+        expected = loop.time() + HEALTH_CHECK_INTERVAL_SECONDS
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL_SECONDS)
+        health_status["loop_lag_ms"] = round(max(0.0, loop.time() - expected) * 1000, 2)
+
+@game_router.on_event("startup")
+async def start_health_monitor():
+    global _health_task
+    _health_task = asyncio.create_task(_health_monitor_loop())
+
+@game_router.on_event("shutdown")
+async def stop_health_monitor():
+    if _health_task:
+        _health_task.cancel()
+
+def _readiness() -> dict:
+    """Evaluate readiness from the cached monitor status"""
+    pool = pool_listener.snapshot()
+    last_check = health_status["last_check"]
+    stale = (
+        last_check is None
+        or datetime.utcnow() - last_check > timedelta(seconds=HEALTH_CHECK_INTERVAL_SECONDS * 3)
+    )
+    reasons = []
+    if stale:
+        reasons.append("database status stale")
+    elif not health_status["db_ok"]:
+        reasons.append("database unreachable")
+    if health_status["loop_lag_ms"] > HEALTH_MAX_LOOP_LAG_MS:
+        reasons.append("event loop lagging")
+    if pool["checkouts_pending"] > HEALTH_MAX_PENDING_CHECKOUTS:
+        reasons.append("too many pending connection checkouts")
+
+    return {
+        "ready": not reasons,
+        "reasons": reasons,
+        "database": {
+            "ok": health_status["db_ok"],
+            "latency_ms": health_status["db_latency_ms"],
+            "error": health_status["db_error"],
+            "last_check": last_check,
+        },
+        "loop_lag_ms": health_status["loop_lag_ms"],
+        "pool": pool,
+    }
+
+@game_router.get("/health/live")
+async def game_liveness_check():
+    """Liveness probe; never touches the database"""
+    return {"status": "alive", "timestamp": datetime.utcnow(), "service": "game_api"}
+
+@game_router.get("/health/ready")
+async def game_readiness_check():
+    """Readiness probe backed by the background health monitor"""
+    readiness = _readiness()
+    if not readiness["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content=jsonable_encoder({"status": "not_ready", "service": "game_api", **readiness})
+        )
+    return {"status": "ready", "timestamp": datetime.utcnow(), "service": "game_api", **readiness}
+
 # Health check for game API
 @game_router.get("/health")
 async def game_health_check():
     """Health check for game API"""
-    try:
-        # Test database connection
-        await db[SCORES_COLLECTION].count_documents({}, limit=1)
-        return {
-            "status": "healthy",
-            "timestamp": datetime.utcnow(),
-            "service": "game_api"
-        }
-    except Exception as e:
-        logger.error(f"Game API health check failed: {str(e)}")
-        raise HTTPException(status_code=503, detail="Service unavailable")
\ No newline at end of file
+    readiness = _readiness()
+    if not readiness["ready"]:
+        logger.error(f"Game API health check failed: {', '.join(readiness['reasons'])}")
+        raise HTTPException(status_code=503, detail="Service unavailable")
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow(),
+        "service": "game_api"
+    }
\ No newline at end of file
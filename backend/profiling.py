@@ -0,0 +1,222 @@
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import PlainTextResponse
+from typing import List, Optional
+from datetime import datetime
+import asyncio
+import heapq
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Profiling settings. A request is profiled when it carries
+# "X-Profile-Token: <PROFILE_TOKEN>" or is picked by PROFILE_SAMPLE_RATE (0..1).
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '2'))
+PROFILE_KEEP_SLOWEST = int(os.environ.get('PROFILE_KEEP_SLOWEST', '20'))
+PROFILE_PATH_PREFIX = "/api/game"
+PROFILE_ADMIN_PREFIX = "/api/game/admin/profiles"
+
+# Min-heap of (duration, seq, profile) holding the slowest profiles seen
+_slowest: list = []
+_seq = itertools.count()
+_slowest_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _await_chain(coro) -> List[str]:
+    """Stack of a suspended coroutine, outermost first, ending at what it awaits"""
+    stack = []
+    obj = coro
+    while obj is not None:
+        frame = getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None) or getattr(obj, "ag_frame", None)
+        if frame is None:
+            stack.append(f"[await {type(obj).__name__}]")
+            break
+        stack.append(_frame_label(frame))
+        obj = getattr(obj, "cr_await", None) or getattr(obj, "gi_yieldfrom", None) or getattr(obj, "ag_await", None)
+    return stack
+
+
+def _running_stack(frame, root_code) -> List[str]:
+    """Stack of the loop thread, outermost first, trimmed to the request task"""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        if frame.f_code is root_code:
+            break
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _token_matches(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN and token) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+class RequestProfiler:
+    """Samples one request's task from a side thread into collapsed stacks
+
+    The sampling thread can only run when it gets the GIL, so a loop thread
+    busy in Python code is sampled late and rarely. Each stack is therefore
+    weighted by the wall time since the previous sample, in microseconds,
+    rather than counted once. The sampling thread records the finished
+    profile itself once stopped, so the event loop never waits for it.
+    """
+
+    def __init__(self, task: asyncio.Task, loop_thread_id: int):
+        self.coro = task.get_coro()
+        self.loop_thread_id = loop_thread_id
+        self.stacks = {}
+        self.samples = 0
+        self.profile = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _sample(self, weight_us: int):
+        if getattr(self.coro, "cr_running", False):
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = _running_stack(frame, self.coro.cr_code)
+        else:
+            stack = _await_chain(self.coro)
+        if stack:
+            key = ";".join(stack)
+            self.stacks[key] = self.stacks.get(key, 0) + weight_us
+            self.samples += 1
+
+    def _run(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        last = time.perf_counter()
+        while not self._stop.wait(interval):
+            now = time.perf_counter()
+            weight_us, last = int((now - last) * 1_000_000), now
+            try:
+                self._sample(weight_us)
+            except Exception:
+                # Frames can disappear mid-walk; drop the sample
+                pass
+
+        self.profile["samples"] = self.samples
+        self.profile["collapsed"] = self.collapsed()
+        _record_profile(self.profile)
+        logger.info(f"Profiled {self.profile['method']} {self.profile['path']}: "
+                    f"{self.profile['duration_ms']}ms, {self.samples} samples")
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, profile: dict):
+        """Stop sampling; the thread adds samples to profile and records it"""
+        self.profile = profile
+        self._stop.set()
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed-stack format, ready for flamegraph.pl / speedscope
+
+        Values are microseconds, not sample counts.
+        """
+        return "\n".join(f"{stack} {weight_us}" for stack, weight_us in sorted(self.stacks.items()))
+
+
+def _record_profile(profile: dict):
+    with _slowest_lock:
+        entry = (profile["duration_ms"], next(_seq), profile)
+        if len(_slowest) < PROFILE_KEEP_SLOWEST:
+            heapq.heappush(_slowest, entry)
+        elif entry[0] > _slowest[0][0]:
+            heapq.heapreplace(_slowest, entry)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles opted-in game API requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        path = scope["path"]
+        if not path.startswith(PROFILE_PATH_PREFIX) or path.startswith(PROFILE_ADMIN_PREFIX):
+            return False
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile-token" and _token_matches(value.decode("latin-1")):
+                return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = RequestProfiler(asyncio.current_task(), threading.get_ident())
+        status = {"code": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop({
+                "id": str(uuid.uuid4()),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status["code"],
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "started_at": started_at,
+            })
+
+
+# Admin endpoints for retained profiles
+profiling_router = APIRouter(prefix=PROFILE_ADMIN_PREFIX, tags=["profiling"])
+
+
+async def require_profile_token(x_profile_token: Optional[str] = Header(None)):
+    if not _token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@profiling_router.get("", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """List retained request profiles, slowest first"""
+    with _slowest_lock:
+        profiles = [entry[2] for entry in sorted(_slowest, reverse=True)]
+    return [
+        {key: value for key, value in profile.items() if key != "collapsed"}
+        for profile in profiles
+    ]
+
+
+@profiling_router.get("/{profile_id}", response_class=PlainTextResponse,
+                      dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str):
+    """Get a profile as collapsed stacks for flamegraph tooling"""
+    with _slowest_lock:
+        for _, _, profile in _slowest:
+            if profile["id"] == profile_id:
+                return profile["collapsed"]
+    raise HTTPException(status_code=404, detail="Profile not found")
+
+
+@profiling_router.delete("", dependencies=[Depends(require_profile_token)])
+async def clear_profiles():
+    """Drop all retained profiles"""
+    with _slowest_lock:
+        _slowest.clear()
+    return {"status": "cleared"}
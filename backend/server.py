@@ -12,6 +12,8 @@ from datetime import datetime
 
 # Import game API
 from game_api import game_router
+from profiling import ProfilingMiddleware, profiling_router
+from static_assets import static_router
 
 
 ROOT_DIR = Path(__file__).parent
@@ -58,6 +60,11 @@ async def get_status_checks():
 # Include the API routers in the main app
 app.include_router(api_router)
 app.include_router(game_router)
+app.include_router(profiling_router)
+app.include_router(static_router)
+
+# Opt-in request profiling (see profiling.py)
+app.add_middleware(ProfilingMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from typing import Optional
+from pathlib import Path
+from email.utils import formatdate, parsedate_to_datetime
+import json
+import mimetypes
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+
+# Output of frontend/public/play/build.js
+PLAY_DIST_DIR = Path(os.environ.get('PLAY_DIST_DIR', ROOT_DIR.parent / 'frontend' / 'public' / 'play' / 'dist')).resolve()
+
+# Precompressed variants written by the build, in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+static_router = APIRouter(prefix="/api/play", tags=["play"])
+
+# (manifest mtime, hashed file names), reloaded whenever a build rewrites the manifest
+_manifest_cache: Optional[tuple] = None
+
+
+def _fingerprinted_files() -> set:
+    """Content-hashed file names listed in the build manifest"""
+    global _manifest_cache
+    manifest_path = PLAY_DIST_DIR / 'manifest.json'
+    try:
+        mtime = manifest_path.stat().st_mtime_ns
+        if _manifest_cache is None or _manifest_cache[0] != mtime:
+            manifest = json.loads(manifest_path.read_text())
+            _manifest_cache = (mtime, {entry["file"] for entry in manifest.values()})
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading play manifest: {str(e)}")
+        _manifest_cache = None
+        return set()
+    return _manifest_cache[1]
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Names from ENCODINGS the client accepts, honouring q=0 and '*'"""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        param = params.strip().replace(" ", "")
+        if param.startswith("q="):
+            try:
+                q = float(param[2:])
+            except ValueError:
+                continue
+        qualities[name.strip().lower()] = q
+
+    accepted = set()
+    for encoding, _ in ENCODINGS:
+        q = qualities.get(encoding, qualities.get("*", 0))
+        if q > 0:
+            accepted.add(encoding)
+    return accepted
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@static_router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_play_asset(file_path: str, request: Request):
+    """Serve game bundles, preferring the precompressed variant"""
+    path = (PLAY_DIST_DIR / (file_path or "index.html")).resolve()
+    if PLAY_DIST_DIR not in path.parents or not path.is_file():
+        raise HTTPException(status_code=404, detail="Not found")
+
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE if path.name in _fingerprinted_files() else REVALIDATE_CACHE,
+        "Vary": "Accept-Encoding",
+    }
+
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    for encoding, suffix in ENCODINGS:
+        variant = path.with_name(path.name + suffix)
+        if encoding in accepted and variant.is_file():
+            headers["Content-Encoding"] = encoding
+            path = variant
+            break
+
+    # Each encoded variant is its own representation, so it gets its own validator
+    stat_result = path.stat()
+    headers["ETag"] = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    headers["Last-Modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+    if _not_modified(request, headers["ETag"], stat_result.st_mtime):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+
+    # Streamed from disk in chunks; see deploy.md for zero-copy delivery
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
@@ -2,16 +2,21 @@
 """
 Backend API Test Suite for 56ers Overbrook Run Game
 Tests all game API endpoints for functionality and data persistence
+
+The score archival test runs POST /admin/archive, which archives every
+eligible run in the target database. It only runs with ALLOW_ARCHIVAL_TEST=1;
+never set that against a shared or production database.
 """
 
 import requests
 import json
 import uuid
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Any
 import os
 from dotenv import load_dotenv
+from pymongo import MongoClient
 
 # Load environment variables
 load_dotenv('/app/frontend/.env')
@@ -21,11 +26,21 @@ BACKEND_URL = os.getenv('REACT_APP_BACKEND_URL', 'http://localhost:8001')
 BASE_URL = f"{BACKEND_URL}/api"
 GAME_API_URL = f"{BASE_URL}/game"
 
+# Backend settings, used to seed runs the API can't create (e.g. old ones)
+# and to reach the token-protected admin routes
+load_dotenv('/app/backend/.env')
+MONGO_URL = os.getenv('MONGO_URL')
+DB_NAME = os.getenv('DB_NAME')
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+ALLOW_ARCHIVAL_TEST = os.getenv('ALLOW_ARCHIVAL_TEST') == '1'
+
 class GameAPITester:
     def __init__(self):
         self.session_id = str(uuid.uuid4())
         self.player_name = "TestPlayer_" + str(int(time.time()))
         self.test_results = {}
+        self.db = MongoClient(MONGO_URL)[DB_NAME] if MONGO_URL and DB_NAME else None
         
     def log_test(self, test_name: str, success: bool, details: str = ""):
         """Log test results"""
@@ -35,6 +50,56 @@ class GameAPITester:
             print(f"   Details: {details}")
         self.test_results[test_name] = {"success": success, "details": details}
         
+    def log_skip(self, test_name: str, reason: str) -> bool:
+        """Log a skipped test (counted as passed)"""
+        print(f"⏭️  SKIP {test_name}")
+        print(f"   Reason: {reason}")
+        self.test_results[test_name] = {"success": True, "details": f"Skipped: {reason}"}
+        return True
+    
+    def seed_run(self, session_id: str, player_name: str, score: int, created_at: datetime) -> dict:
+        """Insert a run straight into game_scores, bypassing the API"""
+        run = {
+            "id": str(uuid.uuid4()),
+            "player_name": player_name,
+            "score": score,
+            "time_survived": 60000,
+            "enemies_defeated": 10,
+            "pickups_collected": 5,
+            "combo_max": 3,
+            "wave_reached": 2,
+            "powerups_used": ["shield", "odd.name", ""],
+            "difficulty": "normal",
+            "created_at": created_at,
+            "session_id": session_id
+        }
+        self.db["game_scores"].insert_one(dict(run))
+        return run
+    
+    def unseed_archived_runs(self, session_id: str, runs: list):
+        """Remove seeded runs from game_scores and back them out of the archive summaries"""
+        hot_ids = set(self.db["game_scores"].distinct("id", {"session_id": session_id}))
+        for run in runs:
+            if run["id"] in hot_ids:
+                continue
+            powerups = {}
+            for powerup in run["powerups_used"]:
+                key = f"powerups.{powerup.replace('.', '_').replace('$', '_') or '_'}"
+                powerups[key] = powerups.get(key, 0) - 1
+            self.db["game_score_archive"].update_one(
+                {"month": run["created_at"].strftime("%Y-%m")},
+                {"$inc": {"total_games": -1, "score_sum": -run["score"],
+                          "time_sum": -run["time_survived"],
+                          "total_enemies": -run["enemies_defeated"],
+                          "total_pickups": -run["pickups_collected"], **powerups}}
+            )
+            self.db["game_score_histogram"].update_one({"score": run["score"]}, {"$inc": {"count": -1}})
+        self.db["game_score_histogram"].delete_many({"count": {"$lte": 0}})
+        self.db["game_score_archive"].delete_many({"total_games": {"$lte": 0}})
+        self.db["game_scores"].delete_many({"session_id": session_id})
+        self.db["game_player_archive"].delete_one({"session_id": session_id})
+        self.db["game_player_timelines"].delete_one({"session_id": session_id})
+        
     def test_health_check(self) -> bool:
         """Test the game API health check endpoint"""
         try:
@@ -56,6 +121,33 @@ class GameAPITester:
             self.log_test("Game API Health Check", False, f"Exception: {str(e)}")
             return False
     
+    def test_health_probes(self) -> bool:
+        """Test the liveness and readiness probes"""
+        try:
+            response = requests.get(f"{GAME_API_URL}/health/live", timeout=10)
+            if response.status_code != 200 or response.json().get("status") != "alive":
+                self.log_test("Health Probes", False, f"Liveness HTTP {response.status_code}: {response.text}")
+                return False
+            
+            response = requests.get(f"{GAME_API_URL}/health/ready", timeout=10)
+            data = response.json()
+            required_fields = ["ready", "reasons", "database", "loop_lag_ms", "pool"]
+            missing_fields = [field for field in required_fields if field not in data]
+            if missing_fields:
+                self.log_test("Health Probes", False, f"Missing fields: {missing_fields}")
+                return False
+            if response.status_code != 200 or not data["ready"]:
+                self.log_test("Health Probes", False, f"Not ready (HTTP {response.status_code}): {data['reasons']}")
+                return False
+            
+            self.log_test("Health Probes", True,
+                          f"Ready, DB latency {data['database']['latency_ms']}ms, loop lag {data['loop_lag_ms']}ms")
+            return True
+            
+        except Exception as e:
+            self.log_test("Health Probes", False, f"Exception: {str(e)}")
+            return False
+    
     def test_score_submission(self) -> bool:
         """Test score submission endpoint"""
         try:
@@ -304,6 +396,227 @@ class GameAPITester:
             self.log_test("Player Scores Retrieval", False, f"Exception: {str(e)}")
             return False
     
+    def test_score_archival(self) -> bool:
+        """Test that archiving old runs leaves stats and ranks unchanged"""
+        try:
+            response = requests.post(f"{GAME_API_URL}/admin/archive", timeout=10)
+            if response.status_code != 403:
+                self.log_test("Score Archival", False, f"Unauthenticated archive returned HTTP {response.status_code}")
+                return False
+            
+            if not ALLOW_ARCHIVAL_TEST:
+                return self.log_skip("Score Archival", "archives the whole target DB; set ALLOW_ARCHIVAL_TEST=1 on a test DB")
+            if self.db is None or not ADMIN_TOKEN:
+                return self.log_skip("Score Archival", "MONGO_URL/DB_NAME/ADMIN_TOKEN not set in backend .env")
+            
+            # Seed low-scoring runs well past any archive age
+            archive_session_id = str(uuid.uuid4())
+            old = datetime.utcnow() - timedelta(days=400)
+            seeded = [
+                self.seed_run(archive_session_id, self.player_name + "_old", score, old + timedelta(days=i))
+                for i, score in enumerate([10, 20, 30])
+            ]
+            try:
+                return self._check_archival(archive_session_id)
+            finally:
+                self.unseed_archived_runs(archive_session_id, seeded)
+            
+        except Exception as e:
+            self.log_test("Score Archival", False, f"Exception: {str(e)}")
+            return False
+    
+    def _check_archival(self, archive_session_id: str) -> bool:
+        def snapshot():
+            stats = requests.get(f"{GAME_API_URL}/stats", timeout=10).json()
+            ranks = {
+                sid: requests.get(f"{GAME_API_URL}/player/{sid}/rank", timeout=10).json()
+                for sid in (self.session_id, archive_session_id)
+            }
+            return stats, ranks
+        
+        stats_before, ranks_before = snapshot()
+        
+        response = requests.post(f"{GAME_API_URL}/admin/archive",
+                               headers={"X-Admin-Token": ADMIN_TOKEN},
+                               timeout=60)
+        if response.status_code != 200:
+            self.log_test("Score Archival", False, f"HTTP {response.status_code}: {response.text}")
+            return False
+        archived = response.json().get("archived", 0)
+        
+        stats_after, ranks_after = snapshot()
+        
+        exact_fields = ["total_games", "total_players", "top_score", "total_enemies_defeated", "total_pickups"]
+        changed = [f for f in exact_fields if stats_before[f] != stats_after[f]]
+        changed += [f for f in ["average_score", "average_time"]
+                    if abs(stats_before[f] - stats_after[f]) > 0.01]
+        if changed:
+            self.log_test("Score Archival", False, f"Stats changed after archival: {changed}")
+            return False
+        if ranks_before != ranks_after:
+            self.log_test("Score Archival", False, f"Ranks changed after archival: {ranks_before} -> {ranks_after}")
+            return False
+        
+        still_hot = self.db["game_scores"].count_documents({"session_id": archive_session_id})
+        if still_hot == 0:
+            # A player whose runs are all archived still has a timeline
+            response = requests.get(f"{GAME_API_URL}/player/{archive_session_id}/timeline", timeout=10)
+            if response.status_code != 200 or response.json().get("total_games") != 3:
+                self.log_test("Score Archival", False,
+                              f"Archived player timeline: HTTP {response.status_code}: {response.text}")
+                return False
+        
+        self.log_test("Score Archival", True,
+                      f"Archived {archived} runs ({3 - still_hot}/3 seeded), stats, ranks and timeline unchanged")
+        return True
+    
+    def test_player_timeline(self) -> bool:
+        """Test the player progress timeline, including history from before timelines existed"""
+        try:
+            response = requests.get(f"{GAME_API_URL}/player/{uuid.uuid4()}/timeline", timeout=10)
+            if response.status_code != 404:
+                self.log_test("Player Timeline", False, f"Unknown player returned HTTP {response.status_code}")
+                return False
+            
+            response = requests.get(f"{GAME_API_URL}/player/{self.session_id}/timeline", timeout=10)
+            if response.status_code != 200:
+                self.log_test("Player Timeline", False, f"HTTP {response.status_code}: {response.text}")
+                return False
+            data = response.json()
+            required_fields = ["session_id", "player_name", "best_score", "total_games",
+                               "personal_bests", "difficulty_bests", "daily"]
+            missing_fields = [field for field in required_fields if field not in data]
+            if missing_fields or data["best_score"] != 15750 or not data["daily"]:
+                self.log_test("Player Timeline", False, f"Missing fields: {missing_fields} or invalid data: {data}")
+                return False
+            
+            if self.db is None:
+                return self.log_skip("Player Timeline", "MONGO_URL/DB_NAME not set, history backfill not checked")
+            
+            # Runs stored before timelines existed, then one new submission
+            history_session_id = str(uuid.uuid4())
+            now = datetime.utcnow()
+            self.seed_run(history_session_id, self.player_name, 100, now - timedelta(days=3))
+            best_run = self.seed_run(history_session_id, self.player_name, 300, now - timedelta(days=2))
+            response = requests.post(f"{GAME_API_URL}/scores", json={
+                "player_name": self.player_name,
+                "score": 200,
+                "time_survived": 30000,
+                "combo_max": 4,
+                "wave_reached": 3,
+                "session_id": history_session_id
+            }, timeout=10)
+            if response.status_code != 200:
+                self.log_test("Player Timeline", False, f"Score submission failed: HTTP {response.status_code}")
+                return False
+            
+            data = requests.get(f"{GAME_API_URL}/player/{history_session_id}/timeline", timeout=10).json()
+            pb_scores = [pb["score"] for pb in data.get("personal_bests", [])]
+            if data.get("total_games") != 3 or data.get("best_score") != 300 or pb_scores != [100, 300]:
+                self.log_test("Player Timeline", False, f"Pre-existing history lost: {data}")
+                return False
+            
+            # Deleting a run must be reflected in the timeline
+            response = requests.delete(f"{GAME_API_URL}/scores/{best_run['id']}", timeout=10)
+            data = requests.get(f"{GAME_API_URL}/player/{history_session_id}/timeline", timeout=10).json()
+            if response.status_code != 200 or data.get("total_games") != 2 or data.get("best_score") != 200:
+                self.log_test("Player Timeline", False, f"Deleted run still in timeline: {data}")
+                return False
+            
+            self.log_test("Player Timeline", True,
+                          f"Timeline has {len(data['daily'])} days, personal bests {pb_scores}, history and deletes reflected")
+            return True
+            
+        except Exception as e:
+            self.log_test("Player Timeline", False, f"Exception: {str(e)}")
+            return False
+    
+    def test_request_profiling(self) -> bool:
+        """Test on-demand request profiling and the profile admin endpoints"""
+        try:
+            response = requests.get(f"{GAME_API_URL}/admin/profiles", timeout=10)
+            if response.status_code != 403:
+                self.log_test("Request Profiling", False, f"Unauthenticated listing returned HTTP {response.status_code}")
+                return False
+            
+            if not PROFILE_TOKEN:
+                return self.log_skip("Request Profiling", "PROFILE_TOKEN not set in backend .env")
+            headers = {"X-Profile-Token": PROFILE_TOKEN}
+            
+            response = requests.get(f"{GAME_API_URL}/stats", headers=headers, timeout=10)
+            if response.status_code != 200:
+                self.log_test("Request Profiling", False, f"Profiled request failed: HTTP {response.status_code}")
+                return False
+            time.sleep(0.5)  # the sampler records the profile after the response
+            
+            response = requests.get(f"{GAME_API_URL}/admin/profiles", headers=headers, timeout=10)
+            profiles = [p for p in response.json() if p.get("path") == "/api/game/stats"] if response.status_code == 200 else []
+            if not profiles:
+                self.log_test("Request Profiling", False, f"No /stats profile retained: HTTP {response.status_code}: {response.text}")
+                return False
+            
+            response = requests.get(f"{GAME_API_URL}/admin/profiles/{profiles[0]['id']}", headers=headers, timeout=10)
+            lines = response.text.splitlines() if response.status_code == 200 else []
+            # Collapsed stacks: "frame;frame;frame <count>"
+            if any(not line.rsplit(" ", 1)[-1].isdigit() for line in lines):
+                self.log_test("Request Profiling", False, f"Invalid collapsed stacks: {response.text[:200]}")
+                return False
+            
+            self.log_test("Request Profiling", True,
+                          f"/stats profiled in {profiles[0]['duration_ms']}ms, {profiles[0]['samples']} samples")
+            return True
+            
+        except Exception as e:
+            self.log_test("Request Profiling", False, f"Exception: {str(e)}")
+            return False
+    
+    def test_play_static(self) -> bool:
+        """Test precompressed, cacheable delivery of the play/ bundles"""
+        try:
+            response = requests.get(f"{BASE_URL}/play/manifest.json", timeout=10)
+            if response.status_code == 404:
+                return self.log_skip("Play Static Delivery", "play bundle not built (run npm run build in frontend/public/play)")
+            if response.status_code != 200:
+                self.log_test("Play Static Delivery", False, f"Manifest HTTP {response.status_code}: {response.text}")
+                return False
+            manifest = response.json()
+            if "no-cache" not in response.headers.get("Cache-Control", ""):
+                self.log_test("Play Static Delivery", False, f"Manifest cache headers: {response.headers.get('Cache-Control')}")
+                return False
+            
+            bundle_url = f"{BASE_URL}/play/{manifest['final-game.js']['file']}"
+            response = requests.get(bundle_url, headers={"Accept-Encoding": "gzip"}, timeout=10)
+            etag = response.headers.get("ETag")
+            if (response.status_code != 200 or
+                    response.headers.get("Content-Encoding") != "gzip" or
+                    "immutable" not in response.headers.get("Cache-Control", "") or
+                    not etag):
+                self.log_test("Play Static Delivery", False, f"Bundle HTTP {response.status_code}, headers: {dict(response.headers)}")
+                return False
+            
+            response = requests.get(bundle_url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag}, timeout=10)
+            if response.status_code != 304:
+                self.log_test("Play Static Delivery", False, f"Conditional request returned HTTP {response.status_code}")
+                return False
+            
+            response = requests.get(bundle_url, headers={"Accept-Encoding": "*"}, stream=True, timeout=10)
+            response.close()
+            if response.headers.get("Content-Encoding") not in ("br", "gzip"):
+                self.log_test("Play Static Delivery", False, "Accept-Encoding: * got an uncompressed bundle")
+                return False
+            
+            response = requests.head(f"{BASE_URL}/play/index.html", timeout=10)
+            if response.status_code != 200 or response.content:
+                self.log_test("Play Static Delivery", False, f"HEAD returned HTTP {response.status_code} with {len(response.content)} bytes")
+                return False
+            
+            self.log_test("Play Static Delivery", True, f"{len(manifest)} bundles, gzip variant served, 304 on revalidation")
+            return True
+            
+        except Exception as e:
+            self.log_test("Play Static Delivery", False, f"Exception: {str(e)}")
+            return False
+    
     def run_all_tests(self) -> Dict[str, Any]:
         """Run all backend API tests"""
         print(f"\n🎮 Starting Backend API Tests for 56ers Overbrook Run Game")
@@ -315,12 +628,17 @@ class GameAPITester:
         # Run tests in logical order
         tests = [
             ("Health Check", self.test_health_check),
+            ("Health Probes", self.test_health_probes),
             ("Score Submission", self.test_score_submission),
             ("Leaderboard", self.test_leaderboard),
             ("Game Statistics", self.test_game_stats),
             ("Analytics", self.test_analytics),
             ("Player Ranking", self.test_player_rank),
             ("Player Scores", self.test_player_scores),
+            ("Score Archival", self.test_score_archival),
+            ("Player Timeline", self.test_player_timeline),
+            ("Request Profiling", self.test_request_profiling),
+            ("Play Static Delivery", self.test_play_static),
         ]
         
         passed = 0
@@ -2,6 +2,8 @@
 
 const fs = require('fs');
 const path = require('path');
+const crypto = require('crypto');
+const zlib = require('zlib');
 
 console.log('🔨 Building 56ers — Overbrook Run...');
 
@@ -9,18 +11,87 @@ console.log('🔨 Building 56ers — Overbrook Run...');
 const BUILD_CONFIG = {
     version: "1.0.0",
     buildDate: new Date().toISOString(),
-    minify: process.env.NODE_ENV === 'production',
-    sourceMap: process.env.NODE_ENV !== 'production'
+    minify: process.env.NODE_ENV !== 'development',
+    sourceMap: process.env.NODE_ENV === 'development',
+    hashLength: 10
 };
 
+// terser is an optional devDependency; without it scripts ship unminified
+let terser = null;
+try {
+    terser = require('terser');
+} catch (error) {
+    console.warn('⚠️  terser not installed, skipping minification (run npm install)');
+}
+
+async function minifyScript(file, content) {
+    if (!BUILD_CONFIG.minify || !terser) {
+        return content;
+    }
+    const result = await terser.minify(content, {
+        compress: { passes: 2 },
+        mangle: true
+    });
+    if (result.code === undefined) {
+        throw new Error(`Minification of ${file} produced no output`);
+    }
+    return result.code;
+}
+
+function contentHash(content) {
+    return crypto.createHash('sha256').update(content).digest('hex').slice(0, BUILD_CONFIG.hashLength);
+}
+
+// Write brotli and gzip variants next to a file so servers can send them as-is
+function writeCompressed(filePath, content) {
+    const buffer = Buffer.from(content);
+    const brotli = zlib.brotliCompressSync(buffer, {
+        params: {
+            [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+            [zlib.constants.BROTLI_PARAM_SIZE_HINT]: buffer.length
+        }
+    });
+    const gzip = zlib.gzipSync(buffer, { level: zlib.constants.Z_BEST_COMPRESSION });
+    fs.writeFileSync(`${filePath}.br`, brotli);
+    fs.writeFileSync(`${filePath}.gz`, gzip);
+    return { size: buffer.length, brotli: brotli.length, gzip: gzip.length };
+}
+
 async function build() {
     try {
-        // Create build directory
+        // Create a clean build directory so stale fingerprinted files don't pile up
         const buildDir = path.join(__dirname, 'dist');
-        if (!fs.existsSync(buildDir)) {
-            fs.mkdirSync(buildDir, { recursive: true });
+        fs.rmSync(buildDir, { recursive: true, force: true });
+        fs.mkdirSync(buildDir, { recursive: true });
+
+        // Minify, fingerprint and precompress JavaScript files
+        console.log('📦 Processing JavaScript...');
+        const jsFiles = [
+            'build-config.js',
+            'enhanced-game.js', 
+            'final-game.js'
+        ];
+
+        const manifest = {};
+        for (const file of jsFiles) {
+            const source = fs.readFileSync(path.join(__dirname, file), 'utf8');
+            const content = await minifyScript(file, source);
+            const hashed = file.replace(/\.js$/, `.${contentHash(content)}.js`);
+
+            fs.writeFileSync(path.join(buildDir, hashed), content);
+            manifest[file] = {
+                file: hashed,
+                integrity: `sha384-${crypto.createHash('sha384').update(content).digest('base64')}`,
+                ...writeCompressed(path.join(buildDir, hashed), content)
+            };
+            console.log(`   ${file} → ${hashed} (${(source.length / 1024).toFixed(1)} KB → ${(manifest[file].brotli / 1024).toFixed(1)} KB br)`);
         }
 
+        fs.writeFileSync(
+            path.join(buildDir, 'manifest.json'),
+            JSON.stringify(manifest, null, 2)
+        );
+
         // Copy HTML file
         console.log('📄 Processing HTML...');
         let html = fs.readFileSync(path.join(__dirname, 'index.html'), 'utf8');
@@ -33,21 +104,14 @@ async function build() {
             <meta name="description"`
         );
 
-        fs.writeFileSync(path.join(buildDir, 'index.html'), html);
-
-        // Copy JavaScript files
-        console.log('📦 Processing JavaScript...');
-        const jsFiles = [
-            'build-config.js',
-            'enhanced-game.js', 
-            'final-game.js'
-        ];
-
-        jsFiles.forEach(file => {
-            const content = fs.readFileSync(path.join(__dirname, file), 'utf8');
-            fs.writeFileSync(path.join(buildDir, file), content);
+        // Point script tags at the fingerprinted bundles
+        Object.entries(manifest).forEach(([file, entry]) => {
+            html = html.split(`src="./${file}"`).join(`src="./${entry.file}"`);
         });
 
+        fs.writeFileSync(path.join(buildDir, 'index.html'), html);
+        writeCompressed(path.join(buildDir, 'index.html'), html);
+
         // Copy other assets
         console.log('📋 Copying assets...');
         const otherFiles = [
@@ -110,7 +174,6 @@ function calculateDirectorySize(dir) {
 }
 
 function generateChecksum(dir) {
-    const crypto = require('crypto');
     const hash = crypto.createHash('md5');
     
     const files = fs.readdirSync(dir).sort();